@@ -1,14 +1,83 @@
+import asyncio
 import datetime
+import functools
 import logging.config
 from environs import Env
 from seller import download_stock
 
+import aiohttp
+import pandas as pd
 import requests
-
-from seller import divide, price_conversion
+from requests.adapters import HTTPAdapter
+
+from seller import (
+    _NON_DIGITS,
+    _RETRY,
+    _json_dumps,
+    _json_loads,
+    _request_with_retry,
+    _stock_values,
+    divide,
+)
 
 logger = logging.getLogger(__file__)
 
+_YM_BASE = "https://api.partner.market.yandex.ru/"
+
+# Общая сессия: держит keep-alive соединения с API Яндекс Маркета,
+# чтобы не выполнять TCP/TLS-рукопожатие на каждый запрос.
+_SESSION = requests.Session()
+# Пул соединений с запасом под параллельные кампании, иначе urllib3
+# сбрасывает keep-alive соединения и открывает новые TLS-сессии.
+_SESSION.mount(
+    "https://api.partner.market.yandex.ru",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        pool_block=False,
+        max_retries=_RETRY,
+    ),
+)
+_SESSION.headers.update(
+    {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Host": "api.partner.market.yandex.ru",
+    }
+)
+
+# Сколько частей остатков/цен загружается параллельно.
+_UPLOAD_CONCURRENCY = 8
+
+
+def _ym_request(method, path, campaign_id, access_token, *, params=None,
+                payload=None):
+    """Функция выполняет запрос к API Яндекс Маркета.
+
+    Args:
+        method (str): HTTP-метод запроса.
+        path (str): Шаблон пути с подстановкой {campaign_id}.
+        campaign_id (str): Идентификатор кампании в Яндекс Маркете.
+        access_token (str): Токен доступа для авторизации в API.
+        params (dict): Параметры строки запроса.
+        payload (dict): Тело запроса.
+
+    Returns:
+        dict: Разобранный ответ API.
+
+    Raises:
+        requests.exceptions.HTTPError: Если запрос возвращает код ошибки HTTP.
+    """
+    response = _SESSION.request(
+        method,
+        _YM_BASE + path.format(campaign_id=campaign_id),
+        headers={"Authorization": f"Bearer {access_token}"},
+        params=params,
+        data=_json_dumps(payload) if payload is not None else None,
+    )
+    response.raise_for_status()
+    return _json_loads(response.content)
+
 
 def get_product_list(page, campaign_id, access_token):
     """Функция возвращает список продуктов из Яндекс Маркета.
@@ -24,21 +93,13 @@ def get_product_list(page, campaign_id, access_token):
     Raises:
         requests.exceptions.HTTPError: Если запрос возвращает код ошибки HTTP.
     """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
-    payload = {
-        "page_token": page,
-        "limit": 200,
-    }
-    url = endpoint_url + f"campaigns/{campaign_id}/offer-mapping-entries"
-    response = requests.get(url, headers=headers, params=payload)
-    response.raise_for_status()
-    response_object = response.json()
+    response_object = _ym_request(
+        "GET",
+        "campaigns/{campaign_id}/offer-mapping-entries",
+        campaign_id,
+        access_token,
+        params={"page_token": page, "limit": 200},
+    )
     return response_object.get("result")
 
 
@@ -56,19 +117,13 @@ def update_stocks(stocks, campaign_id, access_token):
     Raises:
         requests.exceptions.HTTPError: Если запрос возвращает код ошибки HTTP.
     """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
-    payload = {"skus": stocks}
-    url = endpoint_url + f"campaigns/{campaign_id}/offers/stocks"
-    response = requests.put(url, headers=headers, json=payload)
-    response.raise_for_status()
-    response_object = response.json()
-    return response_object
+    return _ym_request(
+        "PUT",
+        "campaigns/{campaign_id}/offers/stocks",
+        campaign_id,
+        access_token,
+        payload={"skus": stocks},
+    )
 
 
 def update_price(prices, campaign_id, access_token):
@@ -85,54 +140,92 @@ def update_price(prices, campaign_id, access_token):
     Raises:
         requests.exceptions.HTTPError: Если запрос возвращает код ошибки HTTP.
     """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
-    payload = {"offers": prices}
-    url = endpoint_url + f"campaigns/{campaign_id}/offer-prices/updates"
-    response = requests.post(url, headers=headers, json=payload)
-    response.raise_for_status()
-    response_object = response.json()
-    return response_object
+    return _ym_request(
+        "POST",
+        "campaigns/{campaign_id}/offer-prices/updates",
+        campaign_id,
+        access_token,
+        payload={"offers": prices},
+    )
 
 
-def get_offer_ids(campaign_id, market_token):
-    """Функция возвращает артикулы товаров Яндекс Маркета.
+def iter_offer_ids(campaign_id, market_token):
+    """Функция постранично отдает артикулы товаров Яндекс Маркета.
+
+    Артикулы выдаются по мере получения страниц каталога, без
+    накопления всех страниц в памяти.
 
     Args:
         campaign_id (str): Идентификатор кампании в Яндекс Маркете.
         market_token (str): Токен доступа к API Яндекс Маркета.
 
-    Returns:
-        list: Список артикулов (shopSku) товаров, найденных в Яндекс Маркете.
+    Yields:
+        str: Артикул (shopSku) товара.
 
     Raises:
         ValueError: Если не удается получить список товаров из API.
     """
     page = ""
-    product_list = []
     while True:
         some_prod = get_product_list(page, campaign_id, market_token)
-        product_list.extend(some_prod.get("offerMappingEntries"))
+        for product in some_prod.get("offerMappingEntries"):
+            yield product.get("offer").get("shopSku")
         page = some_prod.get("paging").get("nextPageToken")
         if not page:
             break
-    offer_ids = []
-    for product in product_list:
-        offer_ids.append(product.get("offer").get("shopSku"))
-    return offer_ids
+
+
+@functools.lru_cache(maxsize=8)
+def get_offer_ids(campaign_id, market_token):
+    """Функция возвращает артикулы товаров Яндекс Маркета.
+
+    Результат кэшируется по паре (campaign_id, market_token), чтобы
+    в рамках одного запуска не обходить страницы каталога повторно.
+
+    Args:
+        campaign_id (str): Идентификатор кампании в Яндекс Маркете.
+        market_token (str): Токен доступа к API Яндекс Маркета.
+
+    Returns:
+        list: Список артикулов (shopSku) товаров, найденных в Яндекс Маркете.
+
+    Raises:
+        ValueError: Если не удается получить список товаров из API.
+    """
+    return list(iter_offer_ids(campaign_id, market_token))
+
+
+def _make_stock(sku, count, warehouse_id, date):
+    """Функция собирает запись остатка в формате API Яндекс Маркета.
+
+    Args:
+        sku (str): Артикул товара.
+        count (int): Количество товара на складе.
+        warehouse_id (str): Идентификатор склада.
+        date (str): Время обновления остатка в формате ISO.
+
+    Returns:
+        dict: Запись остатка для передачи в update_stocks.
+    """
+    return {
+        "sku": sku,
+        "warehouseId": warehouse_id,
+        "items": [
+            {
+                "count": count,
+                "type": "FIT",
+                "updatedAt": date,
+            }
+        ],
+    }
 
 
 def create_stocks(watch_remnants, offer_ids, warehouse_id):
     """Функция возвращает список остатков товаров на складе.
 
     Args:
-        watch_remnants (list): Список остатков часов с их кодами
-        и количествами.
+        watch_remnants (pandas.DataFrame | list): Таблица остатков часов
+        с их кодами и количествами.
         offer_ids (list): Список артикулов товаров для проверки на наличие.
         warehouse_id (str): Идентификатор склада, на котором хранится товар.
 
@@ -148,44 +241,23 @@ def create_stocks(watch_remnants, offer_ids, warehouse_id):
     stocks = list()
     date = str(datetime.datetime.utcnow().replace(
         microsecond=0).isoformat() + "Z")
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append(
-                {
-                    "sku": str(watch.get("Код")),
-                    "warehouseId": warehouse_id,
-                    "items": [
-                        {
-                            "count": stock,
-                            "type": "FIT",
-                            "updatedAt": date,
-                        }
-                    ],
-                }
-            )
-            offer_ids.remove(str(watch.get("Код")))
+    if not isinstance(watch_remnants, pd.DataFrame):
+        # Построчный ввод переводим в DataFrame, чтобы горячий путь
+        # всегда выполнялся векторизованно, а не в цикле Python.
+        watch_remnants = pd.DataFrame(
+            watch_remnants, columns=["Код", "Количество"])
+    codes = watch_remnants["Код"].astype(str)
+    mask = codes.isin(set(offer_ids))
+    # Как и в построчном варианте, повторный код учитывается один раз
+    mask &= ~codes.duplicated()
+    matched = codes[mask]
+    for code, stock in zip(
+        matched, _stock_values(watch_remnants.loc[mask, "Количество"])
+    ):
+        stocks.append(_make_stock(code, int(stock), warehouse_id, date))
     # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
-        stocks.append(
-            {
-                "sku": offer_id,
-                "warehouseId": warehouse_id,
-                "items": [
-                    {
-                        "count": 0,
-                        "type": "FIT",
-                        "updatedAt": date,
-                    }
-                ],
-            }
-        )
+    for offer_id in set(offer_ids) - set(matched):
+        stocks.append(_make_stock(offer_id, 0, warehouse_id, date))
     return stocks
 
 
@@ -193,7 +265,8 @@ def create_prices(watch_remnants, offer_ids):
     """Функция влзвращает список цен на товары.
 
     Args:
-        watch_remnants (list): Список остатков часов с их кодами и ценами.
+        watch_remnants (pandas.DataFrame | list): Таблица остатков часов
+        с их кодами и ценами.
         offer_ids (list): Список артикулов товаров для проверки на наличие.
 
     Returns:
@@ -202,32 +275,88 @@ def create_prices(watch_remnants, offer_ids):
     Raises:
         ValueError: price_conversion отработала с ошибкой.
     """
-    prices = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            price = {
-                "id": str(watch.get("Код")),
-                # "feed": {"id": 0},
-                "price": {
-                    "value": int(price_conversion(watch.get("Цена"))),
-                    # "discountBase": 0,
-                    "currencyId": "RUR",
-                    # "vat": 0,
-                },
-                # "marketSku": 0,
-                # "shopSku": "string",
-            }
-            prices.append(price)
-    return prices
+    if not isinstance(watch_remnants, pd.DataFrame):
+        # Построчный ввод переводим в DataFrame, чтобы горячий путь
+        # всегда выполнялся векторизованно, а не в цикле Python.
+        watch_remnants = pd.DataFrame(watch_remnants, columns=["Код", "Цена"])
+    codes = watch_remnants["Код"].astype(str)
+    mask = codes.isin(set(offer_ids))
+    converted = (
+        watch_remnants.loc[mask, "Цена"]
+        .astype(str)
+        .str.split(".", n=1)
+        .str[0]
+        .str.replace(_NON_DIGITS, "", regex=True)
+        .astype(int)
+    )
+    return [
+        {
+            "id": code,
+            "price": {
+                "value": int(value),
+                "currencyId": "RUR",
+            },
+        }
+        for code, value in zip(codes[mask], converted)
+    ]
+
+
+async def _update_price_async(session, semaphore, prices, campaign_id):
+    """Функция асинхронно обновляет цены одной части товаров.
+
+    Args:
+        session (aiohttp.ClientSession): Сессия с заголовками авторизации.
+        semaphore (asyncio.Semaphore): Ограничитель числа
+            одновременных запросов.
+        prices (list): Часть списка товаров с новыми ценами.
+        campaign_id (str): Идентификатор кампании в Яндекс Маркете.
+
+    Returns:
+        dict: Результаты запроса об обновлении цен.
+
+    Raises:
+        aiohttp.ClientResponseError: Если запрос возвращает
+        код ошибки HTTP.
+    """
+    url = _YM_BASE + f"campaigns/{campaign_id}/offer-prices/updates"
+    async with semaphore:
+        return await _request_with_retry(
+            session, "POST", url, {"offers": prices})
+
+
+async def _update_stocks_async(session, semaphore, stocks, campaign_id):
+    """Функция асинхронно обновляет остатки одной части товаров.
+
+    Args:
+        session (aiohttp.ClientSession): Сессия с заголовками авторизации.
+        semaphore (asyncio.Semaphore): Ограничитель числа
+            одновременных запросов.
+        stocks (list): Часть списка остатков товаров.
+        campaign_id (str): Идентификатор кампании в Яндекс Маркете.
 
+    Returns:
+        dict: Результаты запроса об обновлении остатков.
 
-async def upload_prices(watch_remnants, campaign_id, market_token):
+    Raises:
+        aiohttp.ClientResponseError: Если запрос возвращает
+        код ошибки HTTP.
+    """
+    url = _YM_BASE + f"campaigns/{campaign_id}/offers/stocks"
+    async with semaphore:
+        return await _request_with_retry(
+            session, "PUT", url, {"skus": stocks})
+
+
+async def upload_prices(watch_remnants, campaign_id, market_token,
+                        offer_ids=None):
     """Функция загружает цены для оставшихся часов.
 
     Args:
         watch_remnants (list): Список остатков часов в виде словарей.
         client_id (str): Идентификатор клиента.
         seller_token (str): Токен продавца для аутентификации.
+        offer_ids (list): Заранее полученный список артикулов;
+            если не передан, запрашивается из API.
 
     Returns:
         prices(list): Список цен, который был загружен.
@@ -237,23 +366,38 @@ async def upload_prices(watch_remnants, campaign_id, market_token):
         или update_price вызывают исключения.
 
     """
-    offer_ids = get_offer_ids(campaign_id, market_token)
+    if offer_ids is None:
+        offer_ids = get_offer_ids(campaign_id, market_token)
     prices = create_prices(watch_remnants, offer_ids)
-    for some_prices in list(divide(prices, 500)):
-        update_price(some_prices, campaign_id, market_token)
+    headers = {
+        "Authorization": f"Bearer {market_token}",
+    }
+    semaphore = asyncio.Semaphore(_UPLOAD_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit_per_host=_UPLOAD_CONCURRENCY)
+    async with aiohttp.ClientSession(
+        headers=headers, connector=connector
+    ) as session:
+        tasks = [
+            _update_price_async(session, semaphore, some_prices, campaign_id)
+            for some_prices in divide(prices, 500)
+        ]
+        await asyncio.gather(*tasks)
     return prices
 
 
-async def upload_stocks(watch_remnants, campaign_id, market_token, warehouse_id):
+async def upload_stocks(watch_remnants, campaign_id, market_token,
+                        warehouse_id, offer_ids=None):
     """Функция загружает остатки для оставшихся часов
 
     Args:
         watch_remnants (list): Список остатков часов в виде словарей.
         client_id (str): Идентификатор клиента.
         seller_token (str): Токен продавца для аутентификации.
+        offer_ids (list): Заранее полученный список артикулов;
+            если не передан, запрашивается из API.
 
     Returns:
-        tuple: 
+        tuple:
             - list: Остатки, у которых количество больше 0.
             - list: Полный список всех остатков.
 
@@ -261,16 +405,51 @@ async def upload_stocks(watch_remnants, campaign_id, market_token, warehouse_id)
         Exception: Если функции get_offer_ids, create_stocks
         или update_stocks вызывают исключения.
     """
-    offer_ids = get_offer_ids(campaign_id, market_token)
+    if offer_ids is None:
+        offer_ids = get_offer_ids(campaign_id, market_token)
     stocks = create_stocks(watch_remnants, offer_ids, warehouse_id)
-    for some_stock in list(divide(stocks, 2000)):
-        update_stocks(some_stock, campaign_id, market_token)
-    not_empty = list(
-        filter(lambda stock: (stock.get("items")[0].get("count") != 0), stocks)
-    )
+    headers = {
+        "Authorization": f"Bearer {market_token}",
+    }
+    semaphore = asyncio.Semaphore(_UPLOAD_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit_per_host=_UPLOAD_CONCURRENCY)
+    async with aiohttp.ClientSession(
+        headers=headers, connector=connector
+    ) as session:
+        tasks = [
+            _update_stocks_async(session, semaphore, some_stock, campaign_id)
+            for some_stock in divide(stocks, 2000)
+        ]
+        await asyncio.gather(*tasks)
+    not_empty = [stock for stock in stocks if stock["items"][0]["count"] != 0]
     return not_empty, stocks
 
 
+async def _run_campaign(watch_remnants, campaign_id, warehouse_id,
+                        market_token):
+    """Функция обновляет остатки и цены товаров одной кампании.
+
+    Args:
+        watch_remnants (pandas.DataFrame | list): Таблица остатков часов.
+        campaign_id (str): Идентификатор кампании в Яндекс Маркете.
+        warehouse_id (str): Идентификатор склада кампании.
+        market_token (str): Токен доступа к API Яндекс Маркета.
+
+    Raises:
+        Exception: Если обновление остатков или цен завершилось ошибкой.
+    """
+    offer_ids = await asyncio.to_thread(
+        get_offer_ids, campaign_id, market_token)
+    # Обновить остатки
+    await upload_stocks(
+        watch_remnants, campaign_id, market_token, warehouse_id,
+        offer_ids=offer_ids,
+    )
+    # Поменять цены
+    await upload_prices(
+        watch_remnants, campaign_id, market_token, offer_ids=offer_ids)
+
+
 def main():
     env = Env()
     market_token = env.str("MARKET_TOKEN")
@@ -280,30 +459,31 @@ def main():
     warehouse_dbs_id = env.str("WAREHOUSE_DBS_ID")
 
     watch_remnants = download_stock()
+
+    async def _run_campaigns():
+        # FBS и DBS не зависят друг от друга — выполняем параллельно
+        await asyncio.gather(
+            _run_campaign(
+                watch_remnants, campaign_fbs_id, warehouse_fbs_id,
+                market_token,
+            ),
+            _run_campaign(
+                watch_remnants, campaign_dbs_id, warehouse_dbs_id,
+                market_token,
+            ),
+        )
+
     try:
-        # FBS
-        offer_ids = get_offer_ids(campaign_fbs_id, market_token)
-        # Обновить остатки FBS
-        stocks = create_stocks(watch_remnants, offer_ids, warehouse_fbs_id)
-        for some_stock in list(divide(stocks, 2000)):
-            update_stocks(some_stock, campaign_fbs_id, market_token)
-        # Поменять цены FBS
-        upload_prices(watch_remnants, campaign_fbs_id, market_token)
-
-        # DBS
-        offer_ids = get_offer_ids(campaign_dbs_id, market_token)
-        # Обновить остатки DBS
-        stocks = create_stocks(watch_remnants, offer_ids, warehouse_dbs_id)
-        for some_stock in list(divide(stocks, 2000)):
-            update_stocks(some_stock, campaign_dbs_id, market_token)
-        # Поменять цены DBS
-        upload_prices(watch_remnants, campaign_dbs_id, market_token)
+        asyncio.run(_run_campaigns())
     except requests.exceptions.ReadTimeout:
         print("Превышено время ожидания...")
     except requests.exceptions.ConnectionError as error:
         print(error, "Ошибка соединения")
     except Exception as error:
         print(error, "ERROR_2")
+    finally:
+        get_offer_ids.cache_clear()
+        _SESSION.close()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,100 @@
-import io
+import asyncio
+import json
 import logging.config
-import os
 import re
+import shutil
+import tempfile
 import zipfile
 from environs import Env
 
+import aiohttp
+import numpy as np
 import pandas as pd
 import requests
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 logger = logging.getLogger(__file__)
 
+# Повторяем запросы при 429 и ошибках сервера с экспоненциальной
+# задержкой, учитывая заголовок Retry-After.
+_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(("GET", "POST", "PUT")),
+    respect_retry_after_header=True,
+)
+
+# Общая сессия: держит keep-alive соединения с API Озон,
+# чтобы не выполнять TCP/TLS-рукопожатие на каждый запрос.
+_SESSION = requests.Session()
+# Пул соединений с запасом под параллельные загрузки, иначе urllib3
+# сбрасывает keep-alive соединения и открывает новые TLS-сессии.
+_SESSION.mount(
+    "https://api-seller.ozon.ru",
+    HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        pool_block=False,
+        max_retries=_RETRY,
+    ),
+)
+_SESSION.headers.update({"Content-Type": "application/json"})
+
+# Сколько частей остатков/цен загружается параллельно.
+_UPLOAD_CONCURRENCY = 8
+
+# Символы, не влияющие на числовое значение стоимости.
+_NON_DIGITS = re.compile(r"[^0-9]")
+
+# Таблица удаления всех ASCII-символов, кроме цифр.
+_KEEP_DIGITS = str.maketrans(
+    "", "", "".join(chr(c) for c in range(128) if not 0x30 <= c <= 0x39))
+
+
+def _json_dumps(payload):
+    """Функция сериализует тело запроса в JSON-байты.
+
+    Использует orjson, если он установлен, иначе стандартный json.
+
+    Args:
+        payload (dict): Тело запроса.
+
+    Returns:
+        bytes: Сериализованное тело запроса.
+
+    Raises:
+        TypeError: Если payload содержит несериализуемые значения.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+def _json_loads(content):
+    """Функция разбирает JSON-ответ API.
+
+    Использует orjson, если он установлен, иначе стандартный json.
+
+    Args:
+        content (bytes): Тело ответа API.
+
+    Returns:
+        dict: Разобранный ответ.
+
+    Raises:
+        ValueError: Если тело ответа не является корректным JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 def get_product_list(last_id, client_id, seller_token):
     """Функция возвращает список товаров магазина озон
@@ -41,38 +126,55 @@ def get_product_list(last_id, client_id, seller_token):
         "last_id": last_id,
         "limit": 1000,
     }
-    response = requests.post(url, json=payload, headers=headers)
+    response = _SESSION.post(url, data=_json_dumps(payload), headers=headers)
     response.raise_for_status()
-    response_object = response.json()
+    response_object = _json_loads(response.content)
     return response_object.get("result")
 
 
-def get_offer_ids(client_id, seller_token):
-    """Функция возвращает артикулы товаров магазина Озон.
+def iter_offer_ids(client_id, seller_token):
+    """Функция постранично отдает артикулы товаров магазина Озон.
+
+    Артикулы выдаются по мере получения страниц каталога, без
+    накопления всех страниц в памяти.
 
     Args:
         client_id (str): Идентификатор клиента.
         seller_token (str): Токен продавца для аутентификации.
 
-    Returns:
-        list: Список артикулов товаров.
+    Yields:
+        str: Артикул товара.
 
     Raises:
         HTTPError: Если запрос к API не был успешным.
     """
     last_id = ""
-    product_list = []
+    seen = 0
     while True:
         some_prod = get_product_list(last_id, client_id, seller_token)
-        product_list.extend(some_prod.get("items"))
-        total = some_prod.get("total")
+        items = some_prod.get("items")
+        for product in items:
+            yield product.get("offer_id")
+        seen += len(items)
         last_id = some_prod.get("last_id")
-        if total == len(product_list):
+        if some_prod.get("total") == seen:
             break
-    offer_ids = []
-    for product in product_list:
-        offer_ids.append(product.get("offer_id"))
-    return offer_ids
+
+
+def get_offer_ids(client_id, seller_token):
+    """Функция возвращает артикулы товаров магазина Озон.
+
+    Args:
+        client_id (str): Идентификатор клиента.
+        seller_token (str): Токен продавца для аутентификации.
+
+    Returns:
+        list: Список артикулов товаров.
+
+    Raises:
+        HTTPError: Если запрос к API не был успешным.
+    """
+    return list(iter_offer_ids(client_id, seller_token))
 
 
 def update_price(prices: list, client_id, seller_token):
@@ -94,9 +196,9 @@ def update_price(prices: list, client_id, seller_token):
         "Api-Key": seller_token,
     }
     payload = {"prices": prices}
-    response = requests.post(url, json=payload, headers=headers)
+    response = _SESSION.post(url, data=_json_dumps(payload), headers=headers)
     response.raise_for_status()
-    return response.json()
+    return _json_loads(response.content)
 
 
 def update_stocks(stocks: list, client_id, seller_token):
@@ -119,48 +221,71 @@ def update_stocks(stocks: list, client_id, seller_token):
         "Api-Key": seller_token,
     }
     payload = {"stocks": stocks}
-    response = requests.post(url, json=payload, headers=headers)
+    response = _SESSION.post(url, data=_json_dumps(payload), headers=headers)
     response.raise_for_status()
-    return response.json()
+    return _json_loads(response.content)
 
 
 def download_stock():
-    """Функция возвращет из файла остатков с сайта Casio список товаров.
+    """Функция возвращет из файла остатков с сайта Casio таблицу товаров.
 
     Returns:
-        list: Список остатков часов в виде словарей.
+        pandas.DataFrame: Таблица остатков часов.
 
     Raises:
         HTTPError: Если запрос к сайту не был успешным.
-        FileNotFoundError: Если файл со списком остатков не найден.
+        KeyError: Если файл со списком остатков не найден в архиве.
         Exception: Если возникла ошибка при извлечении или чтении файла.
 
     """
-    # Скачать остатки с сайта
+    # Скачать остатки с сайта, не удерживая весь архив в памяти
     casio_url = "https://timeworld.ru/upload/files/ostatki.zip"
-    session = requests.Session()
-    response = session.get(casio_url)
-    response.raise_for_status()
-    with response, zipfile.ZipFile(io.BytesIO(response.content)) as archive:
-        archive.extractall(".")
-    # Создаем список остатков часов:
-    excel_file = "ostatki.xls"
-    watch_remnants = pd.read_excel(
-        io=excel_file,
-        na_values=None,
-        keep_default_na=False,
-        header=17,
-    ).to_dict(orient="records")
-    os.remove("./ostatki.xls")  # Удалить файл
+    with tempfile.SpooledTemporaryFile(max_size=10 * 1024 * 1024) as buffer:
+        with _SESSION.get(casio_url, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, buffer)
+        # Создаем таблицу остатков часов прямо из архива:
+        with zipfile.ZipFile(buffer) as archive:
+            with archive.open("ostatki.xls") as excel_file:
+                watch_remnants = pd.read_excel(
+                    io=excel_file,
+                    na_values=None,
+                    keep_default_na=False,
+                    header=17,
+                )
     return watch_remnants
 
 
+def _stock_values(counts):
+    """Функция переводит столбец количеств в числовые остатки.
+
+    ">10" считается как 100, "1" — как 0, остальные значения берутся
+    как есть. Числовые ячейки Excel приходят в строковом виде с дробной
+    частью ("3.0") — они приводятся к числу и усекаются до целого.
+
+    Args:
+        counts (pandas.Series): Столбец "Количество" в виде строк.
+
+    Returns:
+        numpy.ndarray: Числовые значения остатков.
+
+    Raises:
+        ValueError: Если значение количества не приводится к числу.
+    """
+    counts = counts.astype(str)
+    numeric = pd.to_numeric(
+        counts.where(~counts.isin((">10", "1")), other="0")).astype(int)
+    return np.select(
+        [counts == ">10", counts == "1"], [100, 0], default=numeric)
+
+
 def create_stocks(watch_remnants, offer_ids):
     """Функция возврщает обновленный список с товарами
 
     Args:
-        watch_remnants (list):
-            Список остатков часов в виде словарей.
+        watch_remnants (pandas.DataFrame | list):
+            Таблица остатков часов или список словарей.
         offer_ids (list):
             Список артикулов товаров.
     Returns:
@@ -172,20 +297,25 @@ def create_stocks(watch_remnants, offer_ids):
             которые не являются словарями.
     """
     # Уберем то, что не загружено в seller
-    stocks = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append({"offer_id": str(watch.get("Код")), "stock": stock})
-            offer_ids.remove(str(watch.get("Код")))
+    if not isinstance(watch_remnants, pd.DataFrame):
+        # Построчный ввод переводим в DataFrame, чтобы горячий путь
+        # всегда выполнялся векторизованно, а не в цикле Python.
+        watch_remnants = pd.DataFrame(
+            watch_remnants, columns=["Код", "Количество"])
+    codes = watch_remnants["Код"].astype(str)
+    mask = codes.isin(set(offer_ids))
+    # Как и в построчном варианте, повторный код учитывается один раз
+    mask &= ~codes.duplicated()
+    matched = codes[mask]
+    stocks = [
+        {"offer_id": code, "stock": int(stock)}
+        for code, stock in zip(
+            matched,
+            _stock_values(watch_remnants.loc[mask, "Количество"]),
+        )
+    ]
     # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
+    for offer_id in set(offer_ids) - set(matched):
         stocks.append({"offer_id": offer_id, "stock": 0})
     return stocks
 
@@ -194,7 +324,8 @@ def create_prices(watch_remnants, offer_ids):
     """Функция обновления стоимости
 
     Args:
-        watch_remnants (list): Данные об остатках товаров с сайта CASIO
+        watch_remnants (pandas.DataFrame | list): Данные об остатках
+            товаров с сайта CASIO
         offer_ids (list): Данные о товарах с OZON
 
     Returns:
@@ -207,18 +338,29 @@ def create_prices(watch_remnants, offer_ids):
             которые не являются словарями.
 
     """
-    prices = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            price = {
-                "auto_action_enabled": "UNKNOWN",
-                "currency_code": "RUB",
-                "offer_id": str(watch.get("Код")),
-                "old_price": "0",
-                "price": price_conversion(watch.get("Цена")),
-            }
-            prices.append(price)
-    return prices
+    if not isinstance(watch_remnants, pd.DataFrame):
+        # Построчный ввод переводим в DataFrame, чтобы горячий путь
+        # всегда выполнялся векторизованно, а не в цикле Python.
+        watch_remnants = pd.DataFrame(watch_remnants, columns=["Код", "Цена"])
+    codes = watch_remnants["Код"].astype(str)
+    mask = codes.isin(set(offer_ids))
+    converted = (
+        watch_remnants.loc[mask, "Цена"]
+        .astype(str)
+        .str.split(".", n=1)
+        .str[0]
+        .str.replace(_NON_DIGITS, "", regex=True)
+    )
+    return [
+        {
+            "auto_action_enabled": "UNKNOWN",
+            "currency_code": "RUB",
+            "offer_id": code,
+            "old_price": "0",
+            "price": price,
+        }
+        for code, price in zip(codes[mask], converted)
+    ]
 
 
 def price_conversion(price: str) -> str:
@@ -236,7 +378,10 @@ def price_conversion(price: str) -> str:
         ValueError: Если входное значение `price` не является строкой
         или пустой строкой.
     """
-    return re.sub("[^0-9]", "", price.split(".")[0])
+    head = price.split(".", 1)[0]
+    if head.isascii():
+        return head.translate(_KEEP_DIGITS)
+    return _NON_DIGITS.sub("", head)
 
 
 def divide(lst: list, n: int):
@@ -257,6 +402,90 @@ def divide(lst: list, n: int):
         yield lst[i: i + n]
 
 
+async def _request_with_retry(session, method, url, payload, max_retries=5):
+    """Функция выполняет запрос с повторами при 429 и ошибках сервера.
+
+    Args:
+        session (aiohttp.ClientSession): Сессия с заголовками авторизации.
+        method (str): HTTP-метод запроса.
+        url (str): Адрес запроса.
+        payload (dict): Тело запроса.
+        max_retries (int): Максимальное количество попыток.
+
+    Returns:
+        dict: Ответ от API в виде словаря.
+
+    Raises:
+        aiohttp.ClientResponseError: Если запрос к API не был успешным
+        после всех повторов.
+    """
+    data = _json_dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    for attempt in range(max_retries):
+        async with session.request(
+            method, url, data=data, headers=headers
+        ) as response:
+            if (
+                response.status in (429, 500, 502, 503, 504)
+                and attempt < max_retries - 1
+            ):
+                delay = 0.5 * 2**attempt
+                retry_after = response.headers.get("Retry-After")
+                if retry_after:
+                    try:
+                        delay = float(retry_after)
+                    except ValueError:
+                        # Retry-After может быть и HTTP-датой — тогда
+                        # остаемся на экспоненциальной задержке.
+                        pass
+                await asyncio.sleep(delay)
+                continue
+            response.raise_for_status()
+            return _json_loads(await response.read())
+
+
+async def _update_price_async(session, semaphore, prices):
+    """Функция асинхронно обновляет цены одной части товаров.
+
+    Args:
+        session (aiohttp.ClientSession): Сессия с заголовками авторизации.
+        semaphore (asyncio.Semaphore): Ограничитель числа
+            одновременных запросов.
+        prices (list): Часть списка товаров с новыми ценами.
+
+    Returns:
+        dict: Ответ от API после обновления цен.
+
+    Raises:
+        aiohttp.ClientResponseError: Если запрос к API не был успешным.
+    """
+    url = "https://api-seller.ozon.ru/v1/product/import/prices"
+    async with semaphore:
+        return await _request_with_retry(
+            session, "POST", url, {"prices": prices})
+
+
+async def _update_stocks_async(session, semaphore, stocks):
+    """Функция асинхронно обновляет остатки одной части товаров.
+
+    Args:
+        session (aiohttp.ClientSession): Сессия с заголовками авторизации.
+        semaphore (asyncio.Semaphore): Ограничитель числа
+            одновременных запросов.
+        stocks (list): Часть списка остатков товаров.
+
+    Returns:
+        dict: Ответ от API после обновления остатков.
+
+    Raises:
+        aiohttp.ClientResponseError: Если запрос к API не был успешным.
+    """
+    url = "https://api-seller.ozon.ru/v1/product/import/stocks"
+    async with semaphore:
+        return await _request_with_retry(
+            session, "POST", url, {"stocks": stocks})
+
+
 async def upload_prices(watch_remnants, client_id, seller_token):
     """Функция загружает цены для оставшихся часов.
 
@@ -275,8 +504,20 @@ async def upload_prices(watch_remnants, client_id, seller_token):
     """
     offer_ids = get_offer_ids(client_id, seller_token)
     prices = create_prices(watch_remnants, offer_ids)
-    for some_price in list(divide(prices, 1000)):
-        update_price(some_price, client_id, seller_token)
+    headers = {
+        "Client-Id": client_id,
+        "Api-Key": seller_token,
+    }
+    semaphore = asyncio.Semaphore(_UPLOAD_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit_per_host=_UPLOAD_CONCURRENCY)
+    async with aiohttp.ClientSession(
+        headers=headers, connector=connector
+    ) as session:
+        tasks = [
+            _update_price_async(session, semaphore, some_price)
+            for some_price in divide(prices, 1000)
+        ]
+        await asyncio.gather(*tasks)
     return prices
 
 
@@ -289,7 +530,7 @@ async def upload_stocks(watch_remnants, client_id, seller_token):
         seller_token (str): Токен продавца для аутентификации.
 
     Returns:
-        tuple: 
+        tuple:
             - list: Остатки, у которых количество больше 0.
             - list: Полный список всех остатков.
 
@@ -299,9 +540,21 @@ async def upload_stocks(watch_remnants, client_id, seller_token):
     """
     offer_ids = get_offer_ids(client_id, seller_token)
     stocks = create_stocks(watch_remnants, offer_ids)
-    for some_stock in list(divide(stocks, 100)):
-        update_stocks(some_stock, client_id, seller_token)
-    not_empty = list(filter(lambda stock: (stock.get("stock") != 0), stocks))
+    headers = {
+        "Client-Id": client_id,
+        "Api-Key": seller_token,
+    }
+    semaphore = asyncio.Semaphore(_UPLOAD_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit_per_host=_UPLOAD_CONCURRENCY)
+    async with aiohttp.ClientSession(
+        headers=headers, connector=connector
+    ) as session:
+        tasks = [
+            _update_stocks_async(session, semaphore, some_stock)
+            for some_stock in divide(stocks, 100)
+        ]
+        await asyncio.gather(*tasks)
+    not_empty = [stock for stock in stocks if stock["stock"] != 0]
     return not_empty, stocks
 
 
@@ -314,11 +567,11 @@ def main():
         watch_remnants = download_stock()
         # Обновить остатки
         stocks = create_stocks(watch_remnants, offer_ids)
-        for some_stock in list(divide(stocks, 100)):
+        for some_stock in divide(stocks, 100):
             update_stocks(some_stock, client_id, seller_token)
         # Поменять цены
         prices = create_prices(watch_remnants, offer_ids)
-        for some_price in list(divide(prices, 900)):
+        for some_price in divide(prices, 900):
             update_price(some_price, client_id, seller_token)
     except requests.exceptions.ReadTimeout:
         print("Превышено время ожидания...")
@@ -326,6 +579,8 @@ def main():
         print(error, "Ошибка соединения")
     except Exception as error:
         print(error, "ERROR_2")
+    finally:
+        _SESSION.close()
 
 
 if __name__ == "__main__":